@@ -85,6 +85,7 @@ CKEDITOR_BASEPATH = "/static/ckeditor/ckeditor/"
 #====================[MIDDLEWARE]====================#
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressedResponseMiddleware",  # Before anything that touches the body
     "corsheaders.middleware.CorsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -160,8 +161,19 @@ media_dir = BASE_DIR / "media"
 if not media_dir.exists():
     media_dir.mkdir(parents=True, exist_ok=True)
 
-# WhiteNoise configuration
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# Media is served by core.media in every environment: storage URLs carry a
+# content hash and are cached as immutable, uploads get .gz/.br siblings.
+# Static files keep plain storage (served by WhiteNoise's middleware): the
+# build does not run collectstatic, so there is no manifest to read.
+STORAGES = {
+    "default": {"BACKEND": "core.media.HashedMediaStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+MEDIA_HASHED_URLS = True
+MEDIA_PRECOMPRESS = True
+MEDIA_UNHASHED_MAX_AGE = 3600
+# e.g. "/protected-media/" to hand file transfer to an nginx internal location
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
 
 #====================[CORS CONFIGURATION]====================#
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # Allow all in development
@@ -255,8 +267,76 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    # Per client, for views that set throttle_scope (see core/throttling.py)
+    "DEFAULT_THROTTLE_RATES": {
+        "search": os.environ.get('THROTTLE_RATE_SEARCH', "30/min"),
+        "like": os.environ.get('THROTTLE_RATE_LIKE', "10/min"),
+        "post_view": os.environ.get('THROTTLE_RATE_POST_VIEW', "120/min"),
+    },
 }
 
+# Token buckets shared by all workers on the host; one file per deployment
+THROTTLE_SHARED_FILE = os.environ.get('THROTTLE_SHARED_FILE', '')
+
+# Days `manage.py compact_changes` keeps delete entries behind /api/changes/;
+# clients whose cursor predates the dropped ones get 410 and resync
+CHANGE_LOG_TOMBSTONE_DAYS = int(os.environ.get('CHANGE_LOG_TOMBSTONE_DAYS', 30))
+
+#====================[CACHE CONFIG]====================#
+CACHES = {
+    # Per worker: read-cache entries, refresh locks
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "blogify",
+    },
+    # Per worker: compressed API bodies, kept apart so they cannot evict read entries
+    "compressed": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "blogify-compressed",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+    # Seen by every worker on the host: the read cache's content version
+    "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get('SHARED_CACHE_DIR', str(BASE_DIR / "var" / "cache")),
+    },
+}
+
+# Read-through cache for PostList/PostDetail (see core/caching.py)
+READ_CACHE = {
+    "TIMEOUT": int(os.environ.get('READ_CACHE_TIMEOUT', 30)),
+    "STALE_TIMEOUT": int(os.environ.get('READ_CACHE_STALE_TIMEOUT', 300)),
+    # Coalescing across workers needs "default" to be shared (Redis/Memcached);
+    # with locmem each worker coalesces its own misses and this stays off
+    "CROSS_PROCESS_LOCK": os.environ.get('READ_CACHE_CROSS_PROCESS_LOCK', 'False') == 'True',
+    "LOCK_TIMEOUT": 5,
+    "SHARED_CACHE": "shared",
+}
+
+# gzip/Brotli for JSON API responses (see core/middleware.py): read-cached
+# endpoints are compressed once per distinct body at the slow levels, the rest
+# per request at the FAST_ levels
+API_COMPRESSION = {
+    "PATH_PREFIX": "/api/",
+    "MIN_SIZE": 512,
+    "CACHE": "compressed",
+    "TIMEOUT": 24 * 60 * 60,
+    "GZIP_LEVEL": 9,
+    "BROTLI_QUALITY": 11,
+    "FAST_GZIP_LEVEL": 6,
+    "FAST_BROTLI_QUALITY": 4,
+}
+
+#====================[ANALYTICS CONFIG]====================#
+# Read/like events are appended here off the request path and rolled up into
+# PostDailyStats (see core/analytics.py). Keep the directory on a persistent
+# disk in production: unrolled segments are lost with an ephemeral one.
+ANALYTICS_LOG_DIR = os.environ.get('ANALYTICS_LOG_DIR', str(BASE_DIR / "var" / "analytics"))
+ANALYTICS_SEGMENT_SECONDS = int(os.environ.get('ANALYTICS_SEGMENT_SECONDS', 60))
+# Seconds between rollups run by the web workers themselves; 0 when
+# `manage.py rollup_analytics --loop` runs as its own process on the same disk
+ANALYTICS_ROLLUP_INTERVAL = int(os.environ.get('ANALYTICS_ROLLUP_INTERVAL', 60))
+
 #====================[CKEDITOR CONFIG]====================#
 CKEDITOR_UPLOAD_PATH = "uploads/"
 CKEDITOR_IMAGE_BACKEND = "pillow"
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Category, Tag
+from .models import Post, Category, Tag, PostDailyStats
 from ckeditor_uploader.widgets import CKEditorUploadingWidget
 from django import forms
 from django.utils.html import mark_safe
@@ -29,10 +29,16 @@ class PostAdmin(admin.ModelAdmin):
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug', 'parent']
+    list_display = ['name', 'slug', 'parent', 'post_count']
     prepopulated_fields = {'slug': ('name',)}
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug']
-    prepopulated_fields = {'slug': ('name',)}
\ No newline at end of file
+    list_display = ['name', 'slug', 'post_count']
+    prepopulated_fields = {'slug': ('name',)}
+
+@admin.register(PostDailyStats)
+class PostDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['post', 'date', 'views', 'likes']
+    list_filter = ['date']
+    date_hierarchy = 'date'
\ No newline at end of file
@@ -0,0 +1,250 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import AnalyticsSegment, Post, PostDailyStats
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+# Engagement events are appended to JSONL segment files by a background thread
+# instead of being written to the database per request. Each worker writes its
+# own "<timestamp>-<pid>.jsonl.open" segment and seals it (drops ".open") every
+# ANALYTICS_SEGMENT_SECONDS. rollup_segments() folds sealed segments into
+# PostDailyStats and the Post.views/likes totals in one transaction per batch,
+# either from `manage.py rollup_analytics --loop` or, when
+# ANALYTICS_ROLLUP_INTERVAL is set, from a thread in each web worker.
+
+logger = logging.getLogger(__name__)
+
+EVENT_KINDS = ('view', 'like')
+OPEN_SUFFIX = '.open'
+SEGMENT_SUFFIX = '.jsonl'
+
+def log_dir():
+    return Path(getattr(settings, 'ANALYTICS_LOG_DIR', settings.BASE_DIR / 'var' / 'analytics'))
+
+def segment_seconds():
+    return getattr(settings, 'ANALYTICS_SEGMENT_SECONDS', 60)
+
+def rollup_interval():
+    return getattr(settings, 'ANALYTICS_ROLLUP_INTERVAL', 0)
+
+
+class EventLog:
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._file = None
+        self._path = None
+        self._opened_at = 0
+
+    def record(self, kind, post_id):
+        self._ensure_writer()
+        self._queue.put(json.dumps({'t': round(time.time(), 3), 'k': kind, 'p': post_id}) + '\n')
+
+    def flush(self, seal=False, timeout=5):
+        """Wait until everything recorded so far is on disk; ``seal`` also closes the segment."""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            # The writer handles the marker after every line queued before it
+            done = threading.Event()
+            self._queue.put((done, seal))
+            done.wait(timeout)
+            return
+        with self._lock:
+            self._write([line for line in self._drain() if isinstance(line, str)])
+            if seal:
+                self._seal()
+
+    def _ensure_writer(self):
+        # A forked worker inherits the object but not the thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._file = None
+            self._thread = threading.Thread(target=self._run, name='analytics-writer', daemon=True)
+            self._thread.start()
+            if rollup_interval():
+                threading.Thread(target=_rollup_forever, name='analytics-rollup', daemon=True).start()
+
+    def _drain(self, block=False):
+        lines = []
+        try:
+            if block:
+                lines.append(self._queue.get(timeout=1))
+            while True:
+                lines.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return lines
+
+    def _run(self):
+        while True:
+            lines = []
+            for item in self._drain(block=True):
+                if isinstance(item, str):
+                    lines.append(item)
+                    continue
+                done, seal = item
+                self._commit(lines, seal)
+                lines = []
+                done.set()
+            self._commit(lines, False)
+
+    def _commit(self, lines, seal):
+        try:
+            with self._lock:
+                self._write(lines)
+                if seal or (self._file and time.time() - self._opened_at >= segment_seconds()):
+                    self._seal()
+        except OSError:
+            logger.exception('Dropping %d analytics event(s)', len(lines))
+
+    def _write(self, lines):
+        if not lines:
+            return
+        if self._file is None:
+            directory = log_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            self._opened_at = time.time()
+            self._path = directory / f'{int(self._opened_at * 1000)}-{os.getpid()}{SEGMENT_SUFFIX}{OPEN_SUFFIX}'
+            self._file = open(self._path, 'a', encoding='utf-8')
+        self._file.writelines(lines)
+        self._file.flush()
+
+    def _seal(self):
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+            os.replace(self._path, str(self._path)[:-len(OPEN_SUFFIX)])
+        finally:
+            self._file = None
+
+
+event_log = EventLog()
+atexit.register(event_log.flush, seal=True)
+
+def record_event(kind, post_id):
+    event_log.record(kind, post_id)
+
+
+def _sealed_segments(directory):
+    segments = sorted(directory.glob(f'*{SEGMENT_SUFFIX}'))
+    # Segments left open by a worker that died are picked up once clearly abandoned
+    cutoff = time.time() - 2 * segment_seconds() - 60
+    segments += sorted(p for p in directory.glob(f'*{SEGMENT_SUFFIX}{OPEN_SUFFIX}') if p.stat().st_mtime < cutoff)
+    return segments
+
+def _read_segment(path):
+    counts = Counter()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+                kind, post_id = event['k'], int(event['p'])
+                stamp = datetime.fromtimestamp(event['t'], tz=dt_timezone.utc)
+            except (ValueError, KeyError, TypeError):
+                continue  # Torn last line from a crashed writer
+            if kind in EVENT_KINDS:
+                counts[post_id, timezone.localdate(stamp), kind] += 1
+    return counts
+
+def _apply(counts):
+    post_ids = set(Post.objects.filter(pk__in={p for p, _, _ in counts}).values_list('pk', flat=True))
+    daily = Counter()
+    totals = Counter()
+    for (post_id, day, kind), n in counts.items():
+        if post_id in post_ids:
+            daily[post_id, day, kind] += n
+            totals[post_id, kind] += n
+
+    keys = {(post_id, day) for post_id, day, _ in daily}
+    existing = {
+        (row.post_id, row.date): row
+        for row in PostDailyStats.objects.filter(
+            post_id__in={p for p, _ in keys}, date__in={d for _, d in keys}
+        )
+    }
+    created, updated = [], []
+    for post_id, day in keys:
+        row = existing.get((post_id, day))
+        if row is None:
+            row = PostDailyStats(post_id=post_id, date=day)
+            created.append(row)
+        else:
+            updated.append(row)
+        row.views += daily[post_id, day, 'view']
+        row.likes += daily[post_id, day, 'like']
+    PostDailyStats.objects.bulk_create(created)
+    PostDailyStats.objects.bulk_update(updated, ['views', 'likes'])
+
+    # One UPDATE per post, not per hit; skips post_save so cached bodies stay valid
+    for post_id in {p for p, _ in totals}:
+        Post.objects.filter(pk=post_id).update(
+            views=F('views') + totals[post_id, 'view'],
+            likes=F('likes') + totals[post_id, 'like'],
+        )
+
+def rollup_segments(batch_size=20, wait=True):
+    """
+    Fold sealed segments into the stats tables. Returns the number of segments
+    processed; without ``wait``, returns 0 if another process is rolling up.
+    """
+    directory = log_dir()
+    if not directory.exists():
+        return 0
+
+    with open(directory / '.rollup.lock', 'w') as lock:
+        if fcntl:
+            try:
+                # One aggregator per host at a time
+                fcntl.flock(lock, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+        segments = _sealed_segments(directory)
+        done = set(AnalyticsSegment.objects.filter(name__in=[p.name for p in segments]).values_list('name', flat=True))
+        processed = 0
+        for start in range(0, len(segments), batch_size):
+            batch = [p for p in segments[start:start + batch_size] if p.name not in done]
+            counts = Counter()
+            for path in batch:
+                counts.update(_read_segment(path))
+            with transaction.atomic():
+                _apply(counts)
+                AnalyticsSegment.objects.bulk_create([AnalyticsSegment(name=p.name) for p in batch])
+            for path in segments[start:start + batch_size]:
+                path.unlink(missing_ok=True)
+            processed += len(batch)
+
+    AnalyticsSegment.objects.filter(processed_date__lt=timezone.now() - timedelta(days=7)).delete()
+    return processed
+
+def _rollup_forever():
+    # Every worker runs one; the non-blocking lock lets the first one in do the work
+    while True:
+        time.sleep(max(rollup_interval(), 1))
+        try:
+            rollup_segments(wait=False)
+        except Exception:
+            logger.exception('Analytics rollup failed')
+        finally:
+            connections.close_all()  # This thread's connections only
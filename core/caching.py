@@ -0,0 +1,165 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from rest_framework.response import Response
+
+# Read-through cache for the public post endpoints. Concurrent misses for the
+# same key are coalesced so only one request per process hits the database,
+# and entries past their fresh window are served stale while one request
+# refreshes them. Entries live in the default cache (per worker with locmem);
+# any content change bumps a version kept in SHARED_CACHE, which every worker
+# reads, and the version is part of every key, so no worker serves an edit stale.
+
+VERSION_KEY = 'core:content-version'
+
+DEFAULTS = {
+    'TIMEOUT': 30,             # seconds an entry is fresh
+    'STALE_TIMEOUT': 300,      # extra seconds a stale entry may be served while refreshing
+    'CROSS_PROCESS_LOCK': False,  # also coalesce across workers; needs a shared default cache
+    'LOCK_TIMEOUT': 5,         # seconds a worker waits on another worker's refresh
+    'SHARED_CACHE': 'default',  # alias every worker sees; holds the content version
+}
+
+def read_cache_setting(name):
+    return getattr(settings, 'READ_CACHE', {}).get(name, DEFAULTS[name])
+
+def shared_cache():
+    return caches[read_cache_setting('SHARED_CACHE')]
+
+def content_version():
+    shared = shared_cache()
+    version = shared.get(VERSION_KEY)
+    if version is None:
+        shared.add(VERSION_KEY, time.time_ns(), None)
+        version = shared.get(VERSION_KEY)
+    return version
+
+def bump_content_version():
+    shared_cache().set(VERSION_KEY, time.time_ns(), None)
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run ``fn`` once per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+flights = SingleFlight()
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+def _store(key, version, status, data):
+    timeout = read_cache_setting('TIMEOUT')
+    entry = {
+        'version': version,
+        'fresh_until': time.time() + timeout,
+        'status': status,
+        'data': data,
+    }
+    if status == 200:
+        cache.set(key, entry, timeout + read_cache_setting('STALE_TIMEOUT'))
+    return entry
+
+def _wait_for_peer(key, version):
+    deadline = time.time() + read_cache_setting('LOCK_TIMEOUT')
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry and entry['version'] == version and entry['fresh_until'] > time.time():
+            return entry
+    return None
+
+def _refresh(key, version, compute, stale=None):
+    if not read_cache_setting('CROSS_PROCESS_LOCK'):
+        return _store(key, version, *compute())
+
+    lock_key = _lock_key(key)
+    if not cache.add(lock_key, 1, read_cache_setting('LOCK_TIMEOUT')):
+        # Another worker is refreshing this key
+        if stale is not None:
+            return stale
+        entry = _wait_for_peer(key, version)
+        if entry is not None:
+            return entry
+        # Peer is slow; compute too, but leave its lock alone
+        return _store(key, version, *compute())
+    try:
+        return _store(key, version, *compute())
+    finally:
+        cache.delete(lock_key)
+
+def read_through(key, compute):
+    """
+    Return a cache entry for ``key``. ``compute`` returns ``(status, data)``
+    and is run at most once per process for concurrent misses.
+    """
+    version = content_version()
+    key = f'{key}:{version}'
+    entry = cache.get(key)
+    if entry is not None:
+        if entry['fresh_until'] > time.time():
+            return entry
+        # Stale: the first request refreshes, the rest keep serving the old body
+        if flights.in_flight(key):
+            return entry
+    return flights.do(key, lambda: _refresh(key, version, compute, stale=entry))
+
+
+class CoalescedReadMixin:
+    """Serve GET responses through ``read_through`` keyed on the full request URL."""
+
+    cache_prefix = 'core:read'
+
+    def get_cache_key(self, request):
+        url = request.build_absolute_uri()
+        return f'{self.cache_prefix}:{self.__class__.__name__}:{hashlib.md5(url.encode()).hexdigest()}'
+
+    def get(self, request, *args, **kwargs):
+        def compute():
+            response = super(CoalescedReadMixin, self).get(request, *args, **kwargs)
+            return response.status_code, response.data
+
+        entry = read_through(self.get_cache_key(request), compute)
+        return Response(entry['data'], status=entry['status'])
@@ -0,0 +1,46 @@
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import Client
+from core.middleware import brotli
+from core.throttling import SharedTokenBucketThrottle
+
+
+class Command(BaseCommand):
+    help = 'Report bytes on the wire and CPU per request for API responses, by encoding'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', default=['/api/posts/', '/api/home/'])
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        # Measure the endpoints, not the throttle: a None rate lets every request through
+        rates = SharedTokenBucketThrottle.THROTTLE_RATES
+        SharedTokenBucketThrottle.THROTTLE_RATES = dict.fromkeys(rates)
+        try:
+            self.run(options)
+        finally:
+            SharedTokenBucketThrottle.THROTTLE_RATES = rates
+
+    def run(self, options):
+        client = Client(HTTP_HOST='localhost')
+        encodings = ['identity', 'gzip'] + (['br'] if brotli else [])
+        self.stdout.write(f"{'url':<24}{'encoding':<10}{'bytes':>10}{'cold ms':>10}{'warm ms':>10}")
+        for url in options['urls']:
+            for encoding in encodings:
+                for cache in caches.all():
+                    cache.clear()
+                # Cold: the body and the compressed variant are both computed
+                start = time.process_time()
+                response = client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+                cold = time.process_time() - start
+
+                start = time.process_time()
+                for _ in range(options['requests']):
+                    client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+                warm = (time.process_time() - start) / options['requests']
+
+                self.stdout.write(
+                    f'{url:<24}{encoding:<10}{len(response.content):>10}{cold * 1000:>10.2f}{warm * 1000:>10.3f}'
+                )
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from core.models import ChangeLogEntry, ChangeLogHorizon
+
+
+class Command(BaseCommand):
+    help = 'Drop superseded change-log entries and tombstones past their retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tombstone-days', type=int, default=getattr(settings, 'CHANGE_LOG_TOMBSTONE_DAYS', 30),
+            help='Keep delete entries this long; clients with older cursors are told to resync',
+        )
+
+    def handle(self, *args, **options):
+        # Clients only ever need the newest entry per object past their
+        # cursor, so older ones can go. That leaves one row per live object
+        # plus the tombstones still inside the retention window.
+        newest = (
+            ChangeLogEntry.objects.values('model', 'object_id')
+            .annotate(newest=Max('id'))
+            .values_list('newest', flat=True)
+        )
+        deleted, _ = ChangeLogEntry.objects.exclude(id__in=newest).delete()
+        self.stdout.write(f'{deleted} superseded change(s) removed')
+
+        cutoff = timezone.now() - timedelta(days=options['tombstone_days'])
+        expired = ChangeLogEntry.objects.filter(action=ChangeLogEntry.DELETE, created_date__lt=cutoff)
+        with transaction.atomic():
+            purged_through = expired.aggregate(newest=Max('id'))['newest']
+            if purged_through is None:
+                purged = 0
+            else:
+                ChangeLogHorizon.objects.update_or_create(pk=1, defaults={'purged_through': purged_through})
+                purged, _ = expired.filter(id__lte=purged_through).delete()
+        self.stdout.write(f'{purged} expired tombstone(s) removed')
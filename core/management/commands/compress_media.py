@@ -0,0 +1,33 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.media import ENCODINGS, compressor
+
+
+class Command(BaseCommand):
+    help = 'Write .gz/.br siblings for compressible files under MEDIA_ROOT'
+
+    def handle(self, *args, **options):
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        written = 0
+        for root, _, files in os.walk(settings.MEDIA_ROOT):
+            for filename in files:
+                path = os.path.join(root, filename)
+                if filename.endswith(suffixes) or not compressor.should_compress(filename):
+                    continue
+                if self.is_current(path, suffixes):
+                    continue
+                written += len(compressor.compress(path))
+        self.stdout.write(f'{written} compressed variant(s) written')
+
+    @staticmethod
+    def is_current(path, suffixes):
+        mtime = int(os.stat(path).st_mtime)
+        for suffix in suffixes:
+            try:
+                if int(os.stat(path + suffix).st_mtime) == mtime:
+                    return True
+            except OSError:
+                pass
+        return False
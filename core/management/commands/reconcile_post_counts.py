@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from core.models import Category, Tag
+from core.signals import log_change
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized published post_count on categories and tags'
+
+    def handle(self, *args, **options):
+        for model in (Category, Tag):
+            fixed = []
+            with transaction.atomic():
+                rows = model.objects.annotate(
+                    actual=Count('post', filter=Q(post__published=True), distinct=True)
+                ).values_list('pk', 'post_count', 'actual')
+                for pk, stored, actual in rows:
+                    if stored != actual:
+                        model.objects.filter(pk=pk).update(post_count=actual)
+                        fixed.append(pk)
+                log_change(model, fixed)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {len(fixed)} counter(s) corrected')
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.analytics import rollup_segments
+
+
+class Command(BaseCommand):
+    help = 'Roll sealed analytics event segments up into per-post daily stats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, rolling up every --interval seconds')
+        parser.add_argument('--interval', type=int, default=60)
+        parser.add_argument('--batch-size', type=int, default=20, help='Segments applied per transaction')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = rollup_segments(batch_size=options['batch_size'])
+            self.stdout.write(f'{processed} segment(s) rolled up')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
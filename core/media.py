@@ -0,0 +1,244 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from whitenoise.compress import Compressor
+
+# Media (featured images, CKEditor uploads) served by Django in every
+# environment. Storage URLs carry a content hash, "name.<hash12>.ext" like
+# WhiteNoise's static manifest, so those responses are immutable. Plain paths
+# (e.g. image URLs baked into CKEditor HTML) get ETag revalidation instead.
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+HASH_LENGTH = 12
+HASHED_NAME_RE = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)?$' % HASH_LENGTH)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+CHUNK_SIZE = 64 * 1024
+
+compressor = Compressor(quiet=True)
+
+_hashes = {}
+_hashes_lock = threading.Lock()
+
+
+def file_hash(path, stat_result=None):
+    """Content hash of ``path``, memoized per (mtime, size) so it is read once."""
+    stat_result = stat_result or os.stat(path)
+    stamp = (stat_result.st_mtime_ns, stat_result.st_size)
+    cached = _hashes.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    digest = hashlib.md5(usedforsecurity=False)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    value = digest.hexdigest()
+    with _hashes_lock:
+        _hashes[path] = (stamp, value)
+    return value
+
+
+def hashed_name(name, digest):
+    stem, ext = posixpath.splitext(name)
+    return f'{stem}.{digest[:HASH_LENGTH]}{ext}'
+
+
+def precompress(path):
+    if getattr(settings, 'MEDIA_PRECOMPRESS', True) and compressor.should_compress(path):
+        return compressor.compress(path)
+    return []
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """FileSystemStorage whose URLs embed the file's content hash."""
+
+    def url(self, name):
+        if not getattr(settings, 'MEDIA_HASHED_URLS', True):
+            return super().url(name)
+        try:
+            digest = file_hash(self.path(name))
+        except (OSError, SuspiciousFileOperation):
+            return super().url(name)
+        return super().url(hashed_name(name, digest))
+
+    def _save(self, name, content):
+        name = super()._save(name, content)
+        precompress(self.path(name))
+        return name
+
+
+def _resolve(path):
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, posixpath.normpath(path).lstrip('/'))
+    except SuspiciousFileOperation:
+        raise Http404('Invalid media path')
+    for _, suffix in ENCODINGS:
+        # A precompressed sibling is only served as the Content-Encoding of its original
+        if fullpath.endswith(suffix) and os.path.isfile(fullpath[:-len(suffix)]):
+            raise Http404('Media file not found')
+    if os.path.isfile(fullpath):
+        return path, fullpath, None
+
+    match = HASHED_NAME_RE.match(path)
+    if match:
+        original = match['stem'] + (match['ext'] or '')
+        try:
+            fullpath = safe_join(settings.MEDIA_ROOT, posixpath.normpath(original).lstrip('/'))
+        except SuspiciousFileOperation:
+            raise Http404('Invalid media path')
+        if os.path.isfile(fullpath):
+            return original, fullpath, match['hash']
+    raise Http404('Media file not found')
+
+
+def _parse_range(header, size):
+    """
+    Return (start, end) for a single ``bytes=`` range, 'unsatisfiable', or
+    None to serve the whole file (missing, malformed or multi-range header).
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    if size == 0:
+        return 'unsatisfiable'  # No byte of an empty file can be addressed
+    start, _, end = header[6:].strip().partition('-')
+    try:
+        if start == '':
+            length = int(end)
+            if length <= 0:
+                return 'unsatisfiable'
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _parse_accept_encoding(header):
+    """``{coding: q}`` from an Accept-Encoding header."""
+    qvalues = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding.strip():
+            qvalues[coding.strip().lower()] = q
+    return qvalues
+
+
+def _select_encoding(request, fullpath, stat_result):
+    qvalues = _parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    for encoding, suffix in ENCODINGS:
+        if qvalues.get(encoding, qvalues.get('*', 0)) <= 0:
+            continue
+        try:
+            variant = os.stat(fullpath + suffix)
+        except OSError:
+            continue
+        # Compressor copies the original mtime (as a float) onto the variant
+        if int(variant.st_mtime) == int(stat_result.st_mtime):
+            return encoding, fullpath + suffix, variant
+    return None, fullpath, stat_result
+
+
+def _iter_range(fullpath, start, length):
+    with open(fullpath, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    name, fullpath, requested_hash = _resolve(path)
+    stat_result = os.stat(fullpath)
+    digest = file_hash(fullpath, stat_result)
+
+    if requested_hash is not None and requested_hash != digest[:HASH_LENGTH]:
+        # Replaced since the URL was issued; point at the current version
+        response = HttpResponseRedirect(settings.MEDIA_URL + quote(hashed_name(name, digest)))
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    byte_range = _parse_range(request.META.get('HTTP_RANGE'), stat_result.st_size)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range is not None and if_range and if_range.strip() != f'"{digest}"':
+        byte_range = None
+
+    # Ranges are always served from the identity file
+    encoding, body_path, body_stat = (None, fullpath, stat_result) if byte_range else \
+        _select_encoding(request, fullpath, stat_result)
+
+    headers = {
+        'ETag': f'"{digest}-{encoding}"' if encoding else f'"{digest}"',
+        'Last-Modified': http_date(stat_result.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': (
+            f'public, max-age={IMMUTABLE_MAX_AGE}, immutable' if requested_hash
+            else f'public, max-age={getattr(settings, "MEDIA_UNHASHED_MAX_AGE", 3600)}'
+        ),
+    }
+
+    response = get_conditional_response(
+        request, etag=headers['ETag'], last_modified=int(stat_result.st_mtime)
+    )
+    if response is not None:
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '')
+    if accel_prefix:
+        # nginx streams the file (sendfile, ranges, gzip_static) from an internal location
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(name)
+        for header, value in headers.items():
+            if header not in ('Accept-Ranges', 'ETag', 'Vary'):
+                response[header] = value
+        return response
+
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat_result.st_size}'
+    elif byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(_iter_range(fullpath, start, length), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat_result.st_size}'
+        response['Content-Length'] = str(length)
+    else:
+        # FileResponse hands the file to wsgi.file_wrapper, i.e. sendfile() under gunicorn
+        response = FileResponse(open(body_path, 'rb'), content_type=content_type, filename=posixpath.basename(name))
+        response['Content-Length'] = str(body_stat.st_size)
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
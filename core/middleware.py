@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from .caching import CoalescedReadMixin
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip only without it
+    brotli = None
+
+# Like django.middleware.gzip.GZipMiddleware, but for the read-cached endpoints
+# (CoalescedReadMixin views) compressed bodies are cached under a hash of the
+# uncompressed body. Those responses repeat, so they pay the compression CPU
+# once per content version and slow, high-ratio levels are affordable. Other
+# bodies (search, change feed, stats) rarely repeat; they get a cheap level and
+# are not cached, so one-off variants never evict the shared ones.
+
+re_accepts_gzip = _lazy_re_compile(r'\bgzip\b')
+re_accepts_br = _lazy_re_compile(r'\bbr\b')
+
+DEFAULTS = {
+    'PATH_PREFIX': '/api/',
+    'MIN_SIZE': 512,          # bytes; smaller bodies are not worth a round through the cache
+    'CACHE': 'default',       # alias holding the compressed variants
+    'TIMEOUT': 24 * 60 * 60,  # seconds a compressed variant is kept
+    'GZIP_LEVEL': 9,          # cached variants
+    'BROTLI_QUALITY': 11,
+    'FAST_GZIP_LEVEL': 6,     # bodies compressed per request
+    'FAST_BROTLI_QUALITY': 4,
+}
+
+def compression_setting(name):
+    return getattr(settings, 'API_COMPRESSION', {}).get(name, DEFAULTS[name])
+
+def compress(body, encoding, fast=False):
+    prefix = 'FAST_' if fast else ''
+    if encoding == 'br':
+        return brotli.compress(body, quality=compression_setting(f'{prefix}BROTLI_QUALITY'))
+    return gzip.compress(body, compresslevel=compression_setting(f'{prefix}GZIP_LEVEL'), mtime=0)
+
+def negotiate(accept_encoding):
+    if brotli is not None and re_accepts_br.search(accept_encoding):
+        return 'br'
+    if re_accepts_gzip.search(accept_encoding):
+        return 'gzip'
+    return None
+
+def compressed_variant(body, encoding):
+    cache = caches[compression_setting('CACHE')]
+    key = f'core:compressed:{encoding}:{hashlib.md5(body, usedforsecurity=False).hexdigest()}'
+    variant = cache.get(key)
+    if variant is None:
+        variant = compress(body, encoding)
+        cache.set(key, variant, compression_setting('TIMEOUT'))
+    return variant
+
+def is_read_cached(request):
+    view_class = getattr(getattr(request.resolver_match, 'func', None), 'view_class', None)
+    return view_class is not None and issubclass(view_class, CoalescedReadMixin)
+
+
+class CompressedResponseMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not request.path.startswith(compression_setting('PATH_PREFIX')):
+            return response
+        if response.streaming or response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith('application/json'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < compression_setting('MIN_SIZE'):
+            return response
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if is_read_cached(request):
+            variant = compressed_variant(response.content, encoding)
+        else:
+            variant = compress(response.content, encoding, fast=True)
+        if len(variant) >= len(response.content):
+            return response
+        response.content = variant
+        response['Content-Length'] = str(len(variant))
+        response['Content-Encoding'] = encoding
+        return response
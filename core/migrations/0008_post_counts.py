@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:33
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_post_counts(apps, schema_editor):
+    for name in ('Category', 'Tag'):
+        model = apps.get_model('core', name)
+        rows = model.objects.annotate(
+            actual=Count('post', filter=Q(post__published=True), distinct=True)
+        ).values_list('pk', 'actual')
+        for pk, actual in rows:
+            if actual:
+                model.objects.filter(pk=pk).update(post_count=actual)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_post_likes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='post_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='post_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(populate_post_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_post_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('processed_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.post')),
+            ],
+            options={
+                'verbose_name_plural': 'Post daily stats',
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('post', 'date'), name='unique_post_daily_stats')],
+            },
+        ),
+    ]
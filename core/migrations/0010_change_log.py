@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:43
+
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    # Existing content is the starting state for clients syncing from cursor 0
+    ChangeLogEntry = apps.get_model('core', 'ChangeLogEntry')
+    for name in ('Category', 'Tag', 'Post'):
+        model = apps.get_model('core', name)
+        ChangeLogEntry.objects.bulk_create([
+            ChangeLogEntry(model=name.lower(), object_id=pk, action='upsert')
+            for pk in model.objects.order_by('pk').values_list('pk', flat=True)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_analytics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Change log entries',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['model', 'object_id'], name='core_change_model_af38b3_idx')],
+            },
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
@@ -6,10 +6,12 @@ class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, max_length=100)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    post_count = models.PositiveIntegerField(default=0, editable=False)  # Published posts, kept by core.signals
 
     class Meta:
         verbose_name_plural = 'Categories'
         ordering = ['name']
+        indexes = [models.Index(fields=['name'])]  # Default ordering without a sort step
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -22,6 +24,10 @@ class Category(models.Model):
 class Tag(models.Model):
     name = models.CharField(max_length=50)
     slug = models.SlugField(unique=True, max_length=50)
+    post_count = models.PositiveIntegerField(default=0, editable=False)  # Published posts, kept by core.signals
+
+    class Meta:
+        indexes = [models.Index(fields=['-post_count', 'name'])]  # Tag cloud order
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -49,6 +55,16 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-created_date']
+        indexes = [
+            # Public listings page newest-first over published posts. Partial
+            # indexes, because SQLite compiles published=True to a bare column
+            # test that a (published, created_date) index cannot seek on.
+            models.Index(fields=['-created_date'], condition=models.Q(published=True), name='post_published_recent_idx'),
+            models.Index(
+                fields=['-created_date'], condition=models.Q(published=True, is_featured=True),
+                name='post_featured_recent_idx',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -56,4 +72,56 @@ class Post(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+class PostDailyStats(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Post daily stats'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'date'], name='unique_post_daily_stats'),
+        ]
+
+    def __str__(self):
+        return f'{self.post} @ {self.date}'
+
+class AnalyticsSegment(models.Model):
+    # Event log segments already rolled up, so a segment is never counted twice
+    name = models.CharField(max_length=255, unique=True)
+    processed_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+class ChangeLogEntry(models.Model):
+    # Append-only feed behind /api/changes/; the auto id is the sync cursor
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = [(UPSERT, 'Created or updated'), (DELETE, 'Deleted')]
+
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'Change log entries'
+        ordering = ['id']
+        indexes = [models.Index(fields=['model', 'object_id'])]
+
+    def __str__(self):
+        return f'#{self.pk} {self.action} {self.model}:{self.object_id}'
+
+
+class ChangeLogHorizon(models.Model):
+    # Single row: the newest tombstone compact_changes has dropped. Cursors
+    # below it may have missed a delete, so those clients must resync
+    purged_through = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'Purged through #{self.purged_through}'
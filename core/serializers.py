@@ -1,15 +1,15 @@
 from rest_framework import serializers
-from .models import Post, Category, Tag
+from .models import Post, Category, Tag, PostDailyStats
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug']
+        fields = ['id', 'name', 'slug', 'post_count']
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
-        fields = ['id', 'name', 'slug']
+        fields = ['id', 'name', 'slug', 'post_count']
 
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField()
@@ -20,4 +20,9 @@ class PostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class PostDailyStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PostDailyStats
+        fields = ['date', 'views', 'likes']
\ No newline at end of file
@@ -0,0 +1,126 @@
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from .caching import bump_content_version
+from .models import Post, Category, Tag, ChangeLogEntry
+
+# Category/Tag post_count only tracks *published* posts, so every path that
+# changes "post P is published and linked to term T" must adjust the counter.
+
+def adjust_post_count(model, pks, delta):
+    if not pks or not delta:
+        return
+    model.objects.filter(pk__in=pks).update(
+        post_count=Greatest(F('post_count') + delta, Value(0))
+    )
+    log_change(model, sorted(pks))  # .update() skips post_save, so the feed needs telling
+
+def _term_model(sender):
+    if sender is Post.categories.through:
+        return Category, 'categories'
+    return Tag, 'tags'
+
+def _on_post_terms_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    model, field = _term_model(sender)
+
+    if not reverse:
+        # instance is a Post, pk_set holds term ids
+        if not instance.published:
+            return
+        if action == 'post_add':
+            adjust_post_count(model, pk_set, 1)
+        elif action == 'pre_remove':
+            existing = getattr(instance, field).filter(pk__in=pk_set).values_list('pk', flat=True)
+            adjust_post_count(model, list(existing), -1)
+        elif action == 'pre_clear':
+            adjust_post_count(model, list(getattr(instance, field).values_list('pk', flat=True)), -1)
+        return
+
+    # instance is a Category/Tag, pk_set holds post ids
+    posts = instance.post_set.filter(published=True)
+    if action == 'post_add':
+        delta = Post.objects.filter(pk__in=pk_set, published=True).count()
+    elif action == 'pre_remove':
+        delta = -posts.filter(pk__in=pk_set).count()
+    elif action == 'pre_clear':
+        delta = -posts.count()
+    else:
+        return
+    adjust_post_count(model, [instance.pk], delta)
+
+m2m_changed.connect(_on_post_terms_changed, sender=Post.categories.through)
+m2m_changed.connect(_on_post_terms_changed, sender=Post.tags.through)
+
+@receiver(pre_save, sender=Post)
+def remember_published_state(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (update_fields is not None and 'published' not in update_fields):
+        instance._was_published = None
+        return
+    instance._was_published = (
+        Post.objects.filter(pk=instance.pk).values_list('published', flat=True).first()
+    )
+
+@receiver(post_save, sender=Post)
+def apply_publish_transition(sender, instance, created, **kwargs):
+    was_published = getattr(instance, '_was_published', None)
+    if created or was_published is None or was_published == instance.published:
+        return
+    delta = 1 if instance.published else -1
+    adjust_post_count(Category, list(instance.categories.values_list('pk', flat=True)), delta)
+    adjust_post_count(Tag, list(instance.tags.values_list('pk', flat=True)), delta)
+
+@receiver(pre_delete, sender=Post)
+def release_post_counts(sender, instance, **kwargs):
+    # Cascading through-row deletes do not fire m2m_changed
+    if not instance.published:
+        return
+    adjust_post_count(Category, list(instance.categories.values_list('pk', flat=True)), -1)
+    adjust_post_count(Tag, list(instance.tags.values_list('pk', flat=True)), -1)
+
+def invalidate_read_cache(sender, **kwargs):
+    # After commit: a reader mid-transaction would cache the old rows under the new version
+    transaction.on_commit(bump_content_version)
+
+for model in (Post, Category, Tag):
+    post_save.connect(invalidate_read_cache, sender=model, dispatch_uid=f'invalidate_read_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_read_cache, sender=model, dispatch_uid=f'invalidate_read_cache_delete_{model.__name__}')
+m2m_changed.connect(invalidate_read_cache, sender=Post.categories.through)
+m2m_changed.connect(invalidate_read_cache, sender=Post.tags.through)
+
+def log_change(model, pks, action=ChangeLogEntry.UPSERT):
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(model=model._meta.model_name, object_id=pk, action=action) for pk in pks
+    ])
+
+def record_save(sender, instance, **kwargs):
+    log_change(sender, [instance.pk])
+
+def record_delete(sender, instance, **kwargs):
+    log_change(sender, [instance.pk], ChangeLogEntry.DELETE)
+
+def record_term_delete(sender, instance, **kwargs):
+    # The cascade drops the through rows without m2m_changed; its posts change too
+    log_change(Post, sorted(instance.post_set.values_list('pk', flat=True)))
+
+def record_post_terms_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # post_clear does not say which posts lost the term
+        instance._cleared_post_ids = list(instance.post_set.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        log_change(Post, [instance.pk])
+    elif action == 'post_clear':
+        log_change(Post, instance.__dict__.pop('_cleared_post_ids', []))
+    elif pk_set:
+        log_change(Post, sorted(pk_set))
+
+for model in (Post, Category, Tag):
+    post_save.connect(record_save, sender=model, dispatch_uid=f'change_log_save_{model.__name__}')
+    post_delete.connect(record_delete, sender=model, dispatch_uid=f'change_log_delete_{model.__name__}')
+for model in (Category, Tag):
+    pre_delete.connect(record_term_delete, sender=model, dispatch_uid=f'change_log_term_delete_{model.__name__}')
+m2m_changed.connect(record_post_terms_change, sender=Post.categories.through)
+m2m_changed.connect(record_post_terms_change, sender=Post.tags.through)
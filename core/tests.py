@@ -1,3 +1,637 @@
-from django.test import TestCase
+import fcntl
+import gzip
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .analytics import event_log, rollup_segments
+from . import middleware
+from .caching import VERSION_KEY, SingleFlight, _refresh, content_version
+from .throttling import SharedBuckets, SharedTokenBucketThrottle
+from .models import Post, Category, Tag, PostDailyStats, ChangeLogEntry
+
+
+def setUpModule():
+    # Fresh token buckets per run instead of the host-wide file, and no
+    # background rollups racing the test transactions
+    global _throttle_dir, _throttle_settings
+    _throttle_dir = tempfile.mkdtemp()
+    _throttle_settings = override_settings(
+        THROTTLE_SHARED_FILE=f'{_throttle_dir}/throttle', ANALYTICS_ROLLUP_INTERVAL=0
+    )
+    _throttle_settings.enable()
+
+def tearDownModule():
+    _throttle_settings.disable()
+    shutil.rmtree(_throttle_dir, ignore_errors=True)
+
+def make_post(slug, **kwargs):
+    return Post.objects.create(title=slug.title(), slug=slug, content='<p>Body</p>', **kwargs)
+
+
+class SealEventLogMixin:
+    """
+    Seal the analytics segment after every test, pass or fail. The writer keeps
+    its file in the log dir that was current when it opened it, so a segment left
+    open would outlive the test's temp dir and swallow later tests' events.
+    tearDown runs before cleanups, i.e. while that dir still exists.
+    """
+
+    def tearDown(self):
+        event_log.flush(seal=True)
+        super().tearDown()
+
+
+class PostCountTests(TestCase):
+    def setUp(self):
+        self.python = Category.objects.create(name='Python')
+        self.django = Tag.objects.create(name='Django')
+
+    def counts(self):
+        self.python.refresh_from_db()
+        self.django.refresh_from_db()
+        return self.python.post_count, self.django.post_count
+
+    def test_add_remove_and_clear(self):
+        post = make_post('first')
+        post.categories.add(self.python)
+        post.tags.add(self.django)
+        post.tags.add(self.django)  # Re-adding an existing link must not double count
+        self.assertEqual(self.counts(), (1, 1))
+
+        post.categories.remove(self.python)
+        post.tags.clear()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_reverse_side_changes(self):
+        published = make_post('published')
+        draft = make_post('draft', published=False)
+        self.python.post_set.add(published, draft)
+        self.assertEqual(self.counts(), (1, 0))
+        self.python.post_set.clear()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_publish_transitions_and_delete(self):
+        post = make_post('toggle', published=False)
+        post.categories.add(self.python)
+        post.tags.add(self.django)
+        self.assertEqual(self.counts(), (0, 0))
+
+        post.published = True
+        post.save()
+        self.assertEqual(self.counts(), (1, 1))
+
+        post.published = False
+        post.save()
+        self.assertEqual(self.counts(), (0, 0))
+
+        post.published = True
+        post.save()
+        post.delete()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_reconcile_command(self):
+        post = make_post('drift')
+        post.categories.add(self.python)
+        Category.objects.update(post_count=7)
+        call_command('reconcile_post_counts', stdout=StringIO())
+        self.assertEqual(self.counts(), (1, 0))
+
+    def test_tag_list_endpoint(self):
+        post = make_post('tagged')
+        post.tags.add(self.django)
+        Tag.objects.create(name='Unused')
+
+        response = APIClient().get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([(t['slug'], t['post_count']) for t in results], [('django', 1), ('unused', 0)])
+
+
+class SingleFlightTests(TestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return 'body'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('k', compute))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        while not flight.in_flight('k'):
+            time.sleep(0.001)
+        time.sleep(0.05)  # Let the followers reach the wait
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['body'] * 8)
+
+
+class CoalescedReadTests(SealEventLogMixin, TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(3):
+            make_post(f'post-{i}').categories.add(Category.objects.get_or_create(name='Python', slug='python')[0])
+
+    def burst(self, url, size=10):
+        queries = []
+        lock = threading.Lock()
+
+        def count(execute, sql, params, many, context):
+            with lock:
+                queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # One client so WhiteNoise's startup file scan runs once, outside the burst
+        client = APIClient()
+        client.handler.load_middleware()
+
+        def hit():
+            try:
+                with connection.execute_wrapper(count):
+                    self.assertEqual(client.get(url).status_code, 200)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=hit) for _ in range(size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return queries
+
+    def test_list_queries_constant_under_burst(self):
+        single = len(self.burst('/api/posts/', size=1))
+        cache.clear()
+        self.assertEqual(len(self.burst('/api/posts/', size=20)), single)
+
+    def test_detail_reads_once_but_counts_every_view(self):
+        with tempfile.TemporaryDirectory() as log_dir, override_settings(ANALYTICS_LOG_DIR=log_dir):
+            queries = self.burst('/api/posts/post-0/', size=20)
+            single = len(self.burst('/api/posts/post-1/', size=1))
+            self.assertEqual(len(queries), single)  # Views go to the event log, not an UPDATE per hit
+
+            event_log.flush(seal=True)
+            rollup_segments()
+        self.assertEqual(Post.objects.get(slug='post-0').views, 20)
+
+    def test_content_change_invalidates(self):
+        self.assertEqual(APIClient().get('/api/posts/').data['count'], 3)
+        make_post('post-new')
+        self.assertEqual(APIClient().get('/api/posts/').data['count'], 4)
+
+    def test_version_bumped_after_commit(self):
+        before = content_version()
+        with transaction.atomic():
+            make_post('post-new')
+            # Readers still see the old rows, so they must keep the old version
+            self.assertEqual(content_version(), before)
+        self.assertNotEqual(content_version(), before)
+
+    def test_version_shared_between_workers(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/posts/').data['count'], 3)
+        # An edit handled by another worker: only the shared version moves here
+        Post.objects.filter(slug='post-0').update(published=False)
+        caches['shared'].set(VERSION_KEY, caches['shared'].get(VERSION_KEY) + 1, None)
+        self.assertEqual(client.get('/api/posts/').data['count'], 2)
+        self.assertIsNone(cache.get(VERSION_KEY))
+
+    @override_settings(READ_CACHE={'TIMEOUT': 30, 'STALE_TIMEOUT': 60, 'CROSS_PROCESS_LOCK': True, 'LOCK_TIMEOUT': 0.1})
+    def test_timed_out_waiter_keeps_peer_lock(self):
+        cache.set('k:1:lock', 1)  # Held by another worker that never finishes
+        entry = _refresh('k:1', 1, lambda: (200, 'fresh'))
+        self.assertEqual(entry['data'], 'fresh')
+        self.assertEqual(cache.get('k:1:lock'), 1)
+
+    @override_settings(READ_CACHE={'TIMEOUT': 0, 'STALE_TIMEOUT': 60, 'CROSS_PROCESS_LOCK': True, 'LOCK_TIMEOUT': 5})
+    def test_stale_entry_served_while_peer_refreshes(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/posts/').status_code, 200)
+        # Simulate another worker holding the refresh lock for every key
+        original_add = cache.add
+        cache.add = lambda key, *args, **kwargs: False if key.endswith(':lock') else original_add(key, *args, **kwargs)
+        try:
+            with self.assertNumQueries(0):
+                self.assertEqual(client.get('/api/posts/').data['count'], 3)
+        finally:
+            cache.add = original_add
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.svg = b'<svg xmlns="http://www.w3.org/2000/svg">' + b'<rect/>' * 200 + b'</svg>'
+        self.name = default_storage.save('uploads/logo.svg', ContentFile(self.svg))
+
+    def test_hashed_url_is_immutable(self):
+        url = default_storage.url(self.name)
+        self.assertRegex(url, r'^/media/uploads/logo\.[0-9a-f]{12}\.svg$')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(b''.join(response.streaming_content), self.svg)
+
+    def test_outdated_hash_redirects(self):
+        response = self.client.get('/media/uploads/logo.000000000000.svg')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], default_storage.url(self.name))
+
+    def test_conditional_and_range_requests(self):
+        etag = self.client.get('/media/uploads/logo.svg')['ETag']
+        self.assertEqual(self.client.get('/media/uploads/logo.svg', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        response = self.client.get('/media/uploads/logo.svg', HTTP_RANGE='bytes=5-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 5-9/{len(self.svg)}')
+        self.assertEqual(b''.join(response.streaming_content), self.svg[5:10])
+
+        response = self.client.get('/media/uploads/logo.svg', HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), self.svg[-4:])
+        self.assertEqual(self.client.get('/media/uploads/logo.svg', HTTP_RANGE=f'bytes={len(self.svg)}-').status_code, 416)
+
+        default_storage.save('uploads/empty.txt', ContentFile(b''))
+        response = self.client.get('/media/uploads/empty.txt', HTTP_RANGE='bytes=-5')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */0'))
+
+    def test_precompressed_variant(self):
+        response = self.client.get('/media/uploads/logo.svg', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.svg)
+        self.assertEqual(self.client.get('/media/uploads/logo.svg.gz').status_code, 404)
+        response = self.client.get('/media/uploads/logo.svg', HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_path_traversal_rejected(self):
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect(self):
+        response = self.client.get(default_storage.url(self.name))
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/uploads/logo.svg')
+        self.assertEqual(response.content, b'')
+
+
+class BundleEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        python = Category.objects.create(name='Python')
+        tag = Tag.objects.create(name='Django')
+        for i in range(4):
+            post = make_post(f'post-{i}', is_featured=i % 2 == 0)
+            post.categories.add(python)
+            post.tags.add(tag)
+        make_post('hidden', published=False)
+
+    def test_home_bundle(self):
+        with self.assertNumQueries(6):
+            response = APIClient().get('/api/home/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['latest']), 4)
+        self.assertEqual({p['slug'] for p in response.data['featured']}, {'post-0', 'post-2'})
+        self.assertEqual(response.data['categories'][0]['post_count'], 4)
+        self.assertEqual(response.data['tags'][0]['slug'], 'django')
+
+    def test_batch_keeps_request_order(self):
+        with self.assertNumQueries(3):
+            response = APIClient().get('/api/posts/batch/?slugs=post-2,missing,hidden,post-0,post-2')
+        self.assertEqual([p['slug'] for p in response.data], ['post-2', 'post-0'])
+
+
+class AnalyticsTests(SealEventLogMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir)
+        override = override_settings(ANALYTICS_LOG_DIR=log_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.post = make_post('tracked')
+
+    def test_events_are_rolled_up(self):
+        client = APIClient()
+        client.get('/api/posts/tracked/')
+        with self.assertNumQueries(0):
+            for _ in range(2):
+                client.get('/api/posts/tracked/')  # Cached body, view goes to the event log
+        with self.assertNumQueries(1):
+            self.assertEqual(client.post('/api/posts/tracked/like/').status_code, 202)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).views, 0)  # Nothing written yet
+
+        event_log.flush(seal=True)
+        self.assertEqual(rollup_segments(), 1)
+        self.assertEqual(rollup_segments(), 0)
+
+        stats = client.get('/api/posts/tracked/stats/').data
+        self.assertEqual((stats['views'], stats['likes']), (3, 1))
+        self.assertEqual([(d['views'], d['likes']) for d in stats['daily']], [(3, 1)])
+        self.assertEqual(PostDailyStats.objects.get().views, 3)
+
+    def test_rollup_accumulates_into_existing_day(self):
+        for _ in range(2):
+            event_log.record('view', self.post.pk)
+            event_log.record('view', 999999)  # Deleted post
+            event_log.flush(seal=True)
+            rollup_segments()
+        self.assertEqual(PostDailyStats.objects.get(post=self.post).views, 2)
+
+    def test_rollup_skips_when_another_worker_holds_the_lock(self):
+        event_log.record('view', self.post.pk)
+        event_log.flush(seal=True)
+        with open(f'{settings.ANALYTICS_LOG_DIR}/.rollup.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.assertEqual(rollup_segments(wait=False), 0)
+        self.assertEqual(rollup_segments(wait=False), 1)
+
+    def test_like_endpoint_in_browsable_api(self):
+        response = APIClient().get('/api/posts/tracked/like/', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 405)
+        self.assertIn(b'<form', response.content)  # POST form rendered
+
+
+class ChangeFeedTests(TestCase):
+    def changes(self, since):
+        return APIClient().get(f'/api/changes/?since={since}').data
+
+    def test_delta_since_cursor(self):
+        python = Category.objects.create(name='Python')
+        post = make_post('synced')
+        post.categories.add(python)
+        cursor = self.changes(0)['cursor']
+
+        post.title = 'Synced again'
+        post.save()
+        doomed = make_post('doomed')
+        doomed_pk = doomed.pk
+        draft = make_post('draft')
+        doomed.delete()
+        draft.published = False
+        draft.save()
+
+        feed = self.changes(cursor)
+        self.assertFalse(feed['has_more'])
+        by_id = {(c['model'], c['id']): c for c in feed['changes']}
+        self.assertEqual(len(by_id), 3)
+        self.assertEqual(by_id['post', post.pk]['data']['title'], 'Synced again')
+        self.assertEqual(by_id['post', doomed_pk]['action'], 'delete')
+        self.assertEqual(by_id['post', draft.pk]['action'], 'delete')
+        self.assertEqual(self.changes(feed['cursor'])['changes'], [])
+
+    def test_term_counters_are_synced(self):
+        python = Category.objects.create(name='Python')
+        post = make_post('counted')
+        cursor = self.changes(0)['cursor']
+
+        post.categories.add(python)
+        feed = self.changes(cursor)
+        by_id = {(c['model'], c['id']): c for c in feed['changes']}
+        self.assertEqual(by_id['category', python.pk]['data']['post_count'], 1)
+
+        post.published = False
+        post.save()
+        by_id = {(c['model'], c['id']): c for c in self.changes(feed['cursor'])['changes']}
+        self.assertEqual(by_id['category', python.pk]['data']['post_count'], 0)
+
+        Category.objects.filter(pk=python.pk).update(post_count=7)
+        cursor = ChangeLogEntry.objects.latest('id').id
+        call_command('reconcile_post_counts', stdout=StringIO())
+        self.assertEqual([(c['model'], c['id']) for c in self.changes(cursor)['changes']], [('category', python.pk)])
+
+    def test_deleted_term_updates_its_posts(self):
+        python = Category.objects.create(name='Python')
+        post = make_post('tagged')
+        post.categories.add(python)
+        cursor = self.changes(0)['cursor']
+
+        python_pk = python.pk
+        python.delete()
+        by_id = {(c['model'], c['id']): c for c in self.changes(cursor)['changes']}
+        self.assertEqual(by_id['category', python_pk]['action'], 'delete')
+        self.assertEqual(by_id['post', post.pk]['data']['categories'], [])
+
+    def test_compaction_keeps_latest_per_object(self):
+        post = make_post('busy')
+        for i in range(3):
+            post.title = f'Edit {i}'
+            post.save()
+        call_command('compact_changes', stdout=StringIO())
+        entry = ChangeLogEntry.objects.get(model='post', object_id=post.pk)
+        self.assertEqual(self.changes(entry.id - 1)['changes'][0]['data']['title'], 'Edit 2')
+
+    def test_expired_tombstones_require_resync(self):
+        live = make_post('live')
+        cursor = self.changes(0)['cursor']
+        make_post('gone').delete()
+        ChangeLogEntry.objects.filter(action=ChangeLogEntry.DELETE).update(
+            created_date=timezone.now() - timedelta(days=31)
+        )
+        call_command('compact_changes', tombstone_days=30, stdout=StringIO())
+        self.assertFalse(ChangeLogEntry.objects.filter(action=ChangeLogEntry.DELETE).exists())
+
+        response = APIClient().get(f'/api/changes/?since={cursor}')
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.data['resync'])
+        feed = self.changes(0)  # Cursors from a resync after the purge stay valid
+        self.assertEqual([c['id'] for c in feed['changes'] if c['model'] == 'post'], [live.pk])
+        self.assertLess(feed['cursor'], feed['horizon'])
+        self.assertEqual(self.changes(f"{feed['cursor']}&horizon={feed['horizon']}")['changes'], [])
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+# The only table SCANs the hot-path test accepts; any other SCAN is a problem.
+# (pattern matched against the SQL, whether every SCAN must walk an index)
+SCAN_ALLOWLIST = [
+    # Page reads: walk an index in ORDER BY order and stop after LIMIT rows
+    (re.compile(r'\bLIMIT \d+$'), True),
+    # PageNumberPagination's COUNT(*): one pass over the narrowest index; the
+    # post lists run it once per content version behind the read cache
+    (re.compile(r'^SELECT COUNT\(\*\)'), True),
+    # Substring search: LIKE '%q%' cannot use a B-tree index at all
+    (re.compile(r"LIKE '%"), False),
+]
+
+def plan_problems(plan, tables, sql=''):
+    """
+    Table scans not covered by SCAN_ALLOWLIST, and temp B-tree sorts unless
+    every table access is an equality lookup (e.g. a prefetch by post_id IN
+    (...), bounded by the page).
+    """
+    accesses = [d for d in plan if re.match(r'(SCAN|SEARCH) (\w+)', d) and d.split()[1] in tables]
+    problems = [d for d in accesses if d.startswith('SCAN')]
+    for pattern, needs_index in SCAN_ALLOWLIST:
+        if pattern.search(sql) and (not needs_index or all(' INDEX ' in d for d in problems)):
+            problems = []
+            break
+    bounded = all(d.startswith('SEARCH') and '=?' in d for d in accesses)
+    if not bounded:
+        problems += [d for d in plan if 'USE TEMP B-TREE' in d]
+    return problems
+
+
+class QueryPlanTests(SealEventLogMixin, TestCase):
+    """Every SELECT issued by the public core.views endpoints must be index-backed."""
+
+    ENDPOINTS = [
+        '/api/posts/',
+        '/api/posts/?category=python',
+        '/api/posts/post-1/',
+        '/api/posts/batch/?slugs=post-1,post-2',
+        '/api/posts/post-1/stats/',
+        '/api/featured-posts/',
+        '/api/categories/',
+        '/api/tags/',
+        '/api/home/',
+        '/api/changes/?since=1',
+        '/api/search/?q=post',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        python = Category.objects.create(name='Python')
+        tag = Tag.objects.create(name='Django')
+        for i in range(12):
+            post = make_post(f'post-{i}', is_featured=i % 3 == 0, published=i != 5)
+            post.categories.add(python)
+            post.tags.add(tag)
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN output is SQLite specific')
+        cache.clear()
+
+    def test_hot_queries_use_indexes(self):
+        tables = set(connection.introspection.table_names())
+        client = APIClient()
+        with tempfile.TemporaryDirectory() as log_dir, override_settings(ANALYTICS_LOG_DIR=log_dir):
+            for url in self.ENDPOINTS:
+                with self.subTest(url=url):
+                    with CaptureQueriesContext(connection) as ctx:
+                        self.assertEqual(client.get(url).status_code, 200)
+                    for query in ctx.captured_queries:
+                        if not query['sql'].startswith('SELECT'):
+                            continue
+                        plan = explain(query['sql'])
+                        self.assertEqual(plan_problems(plan, tables, query['sql']), [], f"{query['sql']}\n{plan}")
+            event_log.flush(seal=True)
+
+    def test_harness_flags_scans_and_sorts(self):
+        tables = set(connection.introspection.table_names())
+        plan = explain('SELECT * FROM core_post WHERE views > 3 ORDER BY title')
+        self.assertEqual(len(plan_problems(plan, tables)), 2)
+
+        # Walking a whole index is still a full scan unless LIMIT stops it
+        sql = 'SELECT id FROM core_post WHERE published ORDER BY created_date DESC'
+        self.assertEqual(len(plan_problems(explain(sql), tables, sql)), 1)
+        self.assertEqual(plan_problems(explain(f'{sql} LIMIT 10'), tables, f'{sql} LIMIT 10'), [])
+
+
+class CompressedResponseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['compressed'].clear()
+        for i in range(5):
+            make_post(f'post-{i}')
+
+    def test_variant_compressed_once_per_body(self):
+        client = APIClient()
+        with mock.patch.object(middleware, 'compress', wraps=middleware.compress) as compress:
+            first = client.get('/api/posts/', HTTP_ACCEPT_ENCODING='gzip')
+            second = client.get('/api/posts/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertEqual(first.content, second.content)
+        self.assertIn('Accept-Encoding', first['Vary'])
+        self.assertEqual(gzip.decompress(first.content), client.get('/api/posts/').content)
+
+    def test_one_off_bodies_compressed_cheaply_and_not_cached(self):
+        client = APIClient()
+        with mock.patch.object(middleware, 'compress', wraps=middleware.compress) as compress, \
+                mock.patch.object(middleware, 'compressed_variant') as compressed_variant:
+            for _ in range(2):
+                response = client.get('/api/search/?q=post', HTTP_ACCEPT_ENCODING='gzip')
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(compress.call_count, 2)
+        self.assertTrue(all(call.kwargs == {'fast': True} for call in compress.call_args_list))
+        compressed_variant.assert_not_called()  # Nothing stored for uncached endpoints
+
+    @mock.patch.object(middleware, 'brotli', None)
+    def test_negotiation(self):
+        self.assertEqual(middleware.negotiate('br, gzip;q=0.8'), 'gzip')
+        self.assertIsNone(middleware.negotiate('identity'))
+        response = APIClient().get('/api/posts/', HTTP_ACCEPT_ENCODING='br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class ThrottleTests(SealEventLogMixin, TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        # Own buckets: the limits exhausted here must not throttle other tests
+        self.enterContext(override_settings(ANALYTICS_LOG_DIR=self.dir, THROTTLE_SHARED_FILE=f'{self.dir}/throttle'))
+        make_post('first')
+
+    def test_buckets_shared_between_mappings(self):
+        path = f'{self.dir}/buckets'
+        first, second = SharedBuckets(path), SharedBuckets(path)  # As two workers would
+        self.assertEqual(first.take('a', 2, 1, 'search', now=100), 0)
+        self.assertEqual(second.take('a', 2, 1, 'search', now=100), 0)
+        self.assertAlmostEqual(first.take('a', 2, 1, 'search', now=100), 1)
+        self.assertAlmostEqual(second.take('a', 2, 1, 'search', now=100.25), 0.75)
+        self.assertEqual(first.take('a', 2, 1, 'search', now=102), 0)  # Refilled
+        self.assertEqual(second.take('b', 2, 1, 'search', now=100), 0)
+        self.assertEqual(second.stats(), {'search': {'allowed': 4, 'throttled': 2}})
+
+    @mock.patch.object(SharedTokenBucketThrottle, 'THROTTLE_RATES', {'search': '2/min', 'like': '1/min', 'post_view': None})
+    def test_scoped_limits_and_retry_after(self):
+        client = APIClient()
+        for _ in range(2):
+            self.assertEqual(client.get('/api/search/', {'q': 'first'}).status_code, 200)
+        response = client.get('/api/search/', {'q': 'first'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+        # Scopes have separate buckets; post_view is unlimited here
+        self.assertEqual(client.post('/api/posts/first/like/').status_code, 202)
+        self.assertEqual(client.post('/api/posts/first/like/').status_code, 429)
+        for _ in range(5):
+            self.assertEqual(client.get('/api/posts/first/').status_code, 200)
+
+    def test_stats_endpoint_is_admin_only(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/throttle-stats/').status_code, 403)
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        client.get('/api/search/', {'q': 'first'})
+        self.assertEqual(client.get('/api/throttle-stats/').data['search'], {'allowed': 1, 'throttled': 0})
@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import ScopedRateThrottle
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: buckets are per process
+    fcntl = None
+
+# Token buckets for the expensive endpoints, kept in a small mmap'd file (on
+# /dev/shm when available) that every gunicorn worker on the host maps. A check
+# is a hash, a file lock and two struct reads/writes, with no cache round trip
+# like DRF's own throttles. Each bucket holds ``num_requests`` tokens and
+# refills at ``num_requests / duration`` per second, so the configured rate is
+# also the burst size.
+
+logger = logging.getLogger(__name__)
+
+BUCKET = struct.Struct('<Qdd8x')   # key hash, tokens, last update
+SCOPE_LENGTH = 16
+STAT = struct.Struct(f'<{SCOPE_LENGTH}sQQ')  # scope, allowed, throttled
+BUCKET_SLOTS = 16384
+STAT_SLOTS = 64
+PROBES = 8
+
+def shared_file():
+    path = getattr(settings, 'THROTTLE_SHARED_FILE', None)
+    if path:
+        return str(path)
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'blogify-throttle')
+
+def key_hash(key):
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') | 1  # Zero marks an empty slot
+
+
+class SharedBuckets:
+    """Fixed-size open-addressing table of token buckets in a shared file."""
+
+    def __init__(self, path, slots=BUCKET_SLOTS, stat_slots=STAT_SLOTS):
+        self.path = path
+        self.slots = slots
+        self.stat_slots = stat_slots
+        self.stats_offset = slots * BUCKET.size
+        size = self.stats_offset + stat_slots * STAT.size
+
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)  # New pages read as zeros, i.e. empty slots
+        self._map = mmap.mmap(self._fd, size)
+
+    def _locked(self):
+        return _FileLock(self._lock, self._fd if fcntl else None)
+
+    def take(self, key, capacity, rate, scope=None, now=None):
+        """
+        Take a token from ``key``'s bucket and count the outcome under ``scope``.
+        Returns 0 on success, else the seconds until a token is available.
+        """
+        now = time.time() if now is None else now
+        h = key_hash(key)
+        with self._locked():
+            offset, tokens, updated = self._find(h, capacity, now)
+            tokens = min(capacity, tokens + max(now - updated, 0) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+            BUCKET.pack_into(self._map, offset, h, tokens, now)
+            if scope:
+                self._count(scope, wait == 0)
+        return wait
+
+    def _find(self, h, capacity, now):
+        start = h % self.slots
+        victim, victim_updated = None, math.inf
+        for i in range(PROBES):
+            offset = ((start + i) % self.slots) * BUCKET.size
+            slot_hash, tokens, updated = BUCKET.unpack_from(self._map, offset)
+            if slot_hash == h:
+                return offset, tokens, updated
+            if slot_hash == 0:
+                victim, victim_updated = offset, -math.inf
+            elif updated < victim_updated:
+                # The least recently used neighbour is the one to evict
+                victim, victim_updated = offset, updated
+        return victim, capacity, now
+
+    def _count(self, scope, allowed):
+        name = scope.encode()[:SCOPE_LENGTH]
+        for i in range(self.stat_slots):
+            offset = self.stats_offset + i * STAT.size
+            slot_name, n_allowed, n_throttled = STAT.unpack_from(self._map, offset)
+            slot_name = slot_name.rstrip(b'\0')
+            if slot_name == name or not slot_name:
+                if allowed:
+                    n_allowed += 1
+                else:
+                    n_throttled += 1
+                STAT.pack_into(self._map, offset, name, n_allowed, n_throttled)
+                return
+
+    def stats(self):
+        """``{scope: {'allowed': n, 'throttled': n}}`` across every process on the host."""
+        result = {}
+        with self._locked():
+            for i in range(self.stat_slots):
+                name, allowed, throttled = STAT.unpack_from(self._map, self.stats_offset + i * STAT.size)
+                if name.rstrip(b'\0'):
+                    result[name.rstrip(b'\0').decode(errors='replace')] = {'allowed': allowed, 'throttled': throttled}
+        return result
+
+
+class _FileLock:
+    # fcntl locks are per process, so threads also need the in-process lock
+    def __init__(self, lock, fd):
+        self.lock = lock
+        self.fd = fd
+
+    def __enter__(self):
+        self.lock.acquire()
+        if self.fd is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1)
+
+    def __exit__(self, *exc_info):
+        if self.fd is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, 1)
+        self.lock.release()
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def get_buckets():
+    """The ``SharedBuckets`` for THROTTLE_SHARED_FILE, or None if it cannot be mapped."""
+    path = shared_file()
+    with _buckets_lock:
+        if path not in _buckets:
+            try:
+                _buckets[path] = SharedBuckets(path)
+            except OSError:
+                logger.exception('Throttling disabled: cannot map %s', path)
+                _buckets[path] = None
+        return _buckets[path]
+
+
+class SharedTokenBucketThrottle(ScopedRateThrottle):
+    """
+    ``ScopedRateThrottle`` backed by the shared token buckets. Views opt in
+    with ``throttle_scope``; rates come from DEFAULT_THROTTLE_RATES.
+    """
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+        buckets = get_buckets()
+        if buckets is None:
+            return True  # Fail open rather than take the API down
+
+        self._wait = buckets.take(
+            self.get_cache_key(request, view), self.num_requests, self.num_requests / self.duration, self.scope
+        )
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait
@@ -1,10 +1,17 @@
 from django.urls import path
-from .views import PostList, PostDetail, SearchView, FeaturedPostsView, CategoryList
+from .views import PostList, PostDetail, SearchView, FeaturedPostsView, CategoryList, TagList, HomeBundleView, PostBatchView, PostLikeView, PostStatsView, ChangeFeedView, ThrottleStatsView
 
 urlpatterns = [
     path('api/posts/', PostList.as_view(), name='post_list'),
+    path('api/posts/batch/', PostBatchView.as_view(), name='post_batch'),  # Before the slug route
     path('api/posts/<slug:slug>/', PostDetail.as_view(), name='post_detail'),
+    path('api/posts/<slug:slug>/like/', PostLikeView.as_view(), name='post_like'),
+    path('api/posts/<slug:slug>/stats/', PostStatsView.as_view(), name='post_stats'),
     path('api/categories/', CategoryList.as_view(), name='category_list'),
+    path('api/tags/', TagList.as_view(), name='tag_list'),
     path('api/search/', SearchView.as_view(), name='search'),
     path('api/featured-posts/', FeaturedPostsView.as_view(), name='featured_posts'),  # New
+    path('api/home/', HomeBundleView.as_view(), name='home'),
+    path('api/changes/', ChangeFeedView.as_view(), name='changes'),
+    path('api/throttle-stats/', ThrottleStatsView.as_view(), name='throttle_stats'),
 ]
\ No newline at end of file
@@ -1,43 +1,95 @@
-from rest_framework import generics
+from datetime import timedelta
+from rest_framework import generics, status
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
-from django.db.models import Q
-from .models import Post, Category
-from .serializers import PostSerializer, CategorySerializer
+from rest_framework.views import APIView
+from django.db.models import Exists, OuterRef, Q, prefetch_related_objects
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from .analytics import record_event
+from .caching import CoalescedReadMixin
+from .models import Post, Category, Tag, ChangeLogEntry, ChangeLogHorizon
+from .serializers import PostSerializer, CategorySerializer, TagSerializer, PostDailyStatsSerializer
+from .throttling import SharedTokenBucketThrottle, get_buckets
 
 class CategoryList(generics.ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
-class PostList(generics.ListAPIView):
+class TagList(generics.ListAPIView):
+    queryset = Tag.objects.order_by('-post_count', 'name')  # Tag cloud order, served from its index
+    serializer_class = TagSerializer
+
+class PostList(CoalescedReadMixin, generics.ListAPIView):
     serializer_class = PostSerializer
 
     def get_queryset(self):
-        queryset = Post.objects.filter(published=True)
+        queryset = Post.objects.filter(published=True).prefetch_related('categories', 'tags')
         category = self.request.query_params.get('category')
         if category:
-            queryset = queryset.filter(categories__slug=category)
-        return queryset.distinct()
+            # EXISTS instead of a join keeps rows unique without DISTINCT, so the
+            # (published, created_date) index still delivers them in order
+            queryset = queryset.filter(Exists(
+                Post.categories.through.objects.filter(post=OuterRef('pk'), category__slug=category)
+            ))
+        return queryset
 
-class PostDetail(generics.RetrieveAPIView):
+class PostDetail(CoalescedReadMixin, generics.RetrieveAPIView):
     queryset = Post.objects.filter(published=True)
     serializer_class = PostSerializer
     lookup_field = 'slug'
+    throttle_classes = [SharedTokenBucketThrottle]
+    throttle_scope = 'post_view'
+
+    def get(self, request, *args, **kwargs):
+        # Counted on every hit, even when the body comes from cache. The event
+        # goes to the analytics log; Post.views catches up on the next rollup
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            record_event('view', response.data['id'])
+        return response
+
+class PostLikeView(APIView):  # No serializer: a plain APIView keeps the browsable API's form working
+    permission_classes = [AllowAny]
+    throttle_classes = [SharedTokenBucketThrottle]
+    throttle_scope = 'like'
+
+    def post(self, request, *args, **kwargs):
+        published = Post.objects.filter(published=True).values_list('pk', flat=True)
+        post_id = get_object_or_404(published, slug=kwargs['slug'])
+        record_event('like', post_id)
+        return Response({'detail': 'Like recorded'}, status=status.HTTP_202_ACCEPTED)
+
+class PostStatsView(generics.RetrieveAPIView):
+    queryset = Post.objects.filter(published=True)
+    lookup_field = 'slug'
+    MAX_DAYS = 365
 
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        instance.views += 1
-        instance.save()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        post = self.get_object()
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), self.MAX_DAYS)
+        except ValueError:
+            days = 30
+        since = timezone.localdate() - timedelta(days=days - 1)
+        daily = post.daily_stats.filter(date__gte=since).order_by('date')
+        return Response({
+            'slug': post.slug,
+            'views': post.views,
+            'likes': post.likes,
+            'daily': PostDailyStatsSerializer(daily, many=True).data,
+        })
 
 class SearchView(generics.ListAPIView):
     serializer_class = PostSerializer
+    throttle_classes = [SharedTokenBucketThrottle]
+    throttle_scope = 'search'  # LIKE scans over every post
 
     def get_queryset(self):
         query = self.request.query_params.get('q', '')
         category = self.request.query_params.get('category', '')
         tag = self.request.query_params.get('tag', '')
-        queryset = Post.objects.filter(published=True)
+        queryset = Post.objects.filter(published=True).prefetch_related('categories', 'tags')
         if query:
             q_objects = Q(title__icontains=query) | Q(content__icontains=query)
             if category:
@@ -47,10 +99,143 @@ class SearchView(generics.ListAPIView):
                 for t in tag.split(','):
                     q_objects |= Q(tags__name__icontains=t.strip())
             queryset = queryset.filter(q_objects)
-        return queryset.distinct().order_by('-created_date')
+            if category or tag:
+                queryset = queryset.distinct()  # Only the joins can duplicate rows
+        return queryset.order_by('-created_date')
 
 class FeaturedPostsView(generics.ListAPIView):  # New: Featured posts
     serializer_class = PostSerializer
 
     def get_queryset(self):
-        return Post.objects.filter(published=True, is_featured=True).order_by('-created_date')[:5]  # Top 5 featured
\ No newline at end of file
+        return Post.objects.filter(published=True, is_featured=True).prefetch_related('categories', 'tags').order_by('-created_date')[:5]  # Top 5 featured
+
+class HomeBundleView(CoalescedReadMixin, generics.RetrieveAPIView):
+    """Everything the landing page needs in one round trip."""
+
+    LATEST_COUNT = 10
+    FEATURED_COUNT = 5
+    CATEGORY_COUNT = 50  # A bounded read of the name index, not a walk of all of it
+    TAG_COUNT = 10
+
+    def retrieve(self, request, *args, **kwargs):
+        published = Post.objects.filter(published=True)
+        latest = list(published[:self.LATEST_COUNT])
+        featured = list(published.filter(is_featured=True)[:self.FEATURED_COUNT])
+
+        # One prefetch pass for both lists; featured posts are usually also latest
+        posts = {post.pk: post for post in featured + latest}
+        prefetch_related_objects(list(posts.values()), 'categories', 'tags')
+        context = self.get_serializer_context()
+
+        return Response({
+            'featured': PostSerializer([posts[p.pk] for p in featured], many=True, context=context).data,
+            'latest': PostSerializer([posts[p.pk] for p in latest], many=True, context=context).data,
+            'categories': CategorySerializer(
+                Category.objects.filter(post_count__gt=0)[:self.CATEGORY_COUNT], many=True
+            ).data,
+            'tags': TagSerializer(
+                Tag.objects.filter(post_count__gt=0).order_by('-post_count', 'name')[:self.TAG_COUNT], many=True
+            ).data,
+        })
+
+class PostBatchView(CoalescedReadMixin, generics.ListAPIView):
+    """``/api/posts/batch/?slugs=a,b,c`` - several posts in one IN query, in request order."""
+
+    serializer_class = PostSerializer
+    pagination_class = None
+    MAX_SLUGS = 50
+
+    def get_slugs(self):
+        slugs = self.request.query_params.get('slugs', '')
+        return list(dict.fromkeys(s.strip() for s in slugs.split(',') if s.strip()))[:self.MAX_SLUGS]
+
+    def get_queryset(self):
+        # Unordered: list() puts them in request order anyway
+        return Post.objects.filter(published=True, slug__in=self.get_slugs()).prefetch_related('categories', 'tags').order_by()
+
+    def list(self, request, *args, **kwargs):
+        posts = {post.slug: post for post in self.get_queryset()}
+        ordered = [posts[slug] for slug in self.get_slugs() if slug in posts]
+        return Response(self.get_serializer(ordered, many=True).data)
+
+
+class ChangeFeedView(generics.GenericAPIView):
+    """
+    ``/api/changes/?since=<cursor>`` - posts, categories and tags changed after
+    ``cursor``. Each object appears once with its latest state, or as a
+    tombstone if it was deleted (or unpublished, for posts). Pass back the
+    ``horizon`` from the previous response; a cursor that predates the oldest
+    tombstones still kept gets 410 Gone and must resync from ``since=0``.
+    """
+
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 500
+    FEEDS = {
+        'post': (Post.objects.filter(published=True).prefetch_related('categories', 'tags').order_by(), PostSerializer),
+        'category': (Category.objects.all(), CategorySerializer),
+        'tag': (Tag.objects.all(), TagSerializer),
+    }
+
+    def get_int_param(self, name, default, upper):
+        try:
+            return min(max(int(self.request.query_params.get(name, default)), 0), upper)
+        except ValueError:
+            return default
+
+    def get(self, request, *args, **kwargs):
+        since = self.get_int_param('since', 0, 2 ** 63 - 1)
+        limit = self.get_int_param('limit', self.DEFAULT_LIMIT, self.MAX_LIMIT) or self.DEFAULT_LIMIT
+        # Clients echo the horizon they last saw; a cursor below the current one
+        # obtained before the latest purge may have missed a dropped tombstone
+        horizon = ChangeLogHorizon.objects.filter(pk=1).values_list('purged_through', flat=True).first() or 0
+        if 0 < since < horizon and self.get_int_param('horizon', 0, 2 ** 63 - 1) != horizon:
+            return Response(
+                {'detail': 'Cursor is older than the change log; resync from since=0.', 'resync': True},
+                status=status.HTTP_410_GONE,
+            )
+        entries = list(ChangeLogEntry.objects.filter(id__gt=since).order_by('id')[:limit])
+
+        # Only the newest entry per object matters within a page
+        latest = {}
+        for entry in entries:
+            latest.pop((entry.model, entry.object_id), None)
+            latest[entry.model, entry.object_id] = entry
+
+        wanted = {}
+        for (model, object_id), entry in latest.items():
+            if entry.action == ChangeLogEntry.UPSERT:
+                wanted.setdefault(model, set()).add(object_id)
+        context = self.get_serializer_context()
+        data = {}
+        for model, ids in wanted.items():
+            queryset, serializer_class = self.FEEDS[model]
+            for obj in queryset.filter(pk__in=ids):
+                data[model, obj.pk] = serializer_class(obj, context=context).data
+
+        changes = []
+        for (model, object_id), entry in latest.items():
+            item = data.get((model, object_id))
+            changes.append({
+                'cursor': entry.id,
+                'model': model,
+                'id': object_id,
+                'action': ChangeLogEntry.UPSERT if item is not None else ChangeLogEntry.DELETE,
+                'data': item,
+            })
+
+        return Response({
+            'cursor': entries[-1].id if entries else since,
+            'horizon': horizon,
+            'has_more': len(entries) == limit,
+            'changes': changes,
+        })
+
+
+class ThrottleStatsView(generics.GenericAPIView):
+    """Allowed/throttled counts per scope, summed over all workers on this host."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        buckets = get_buckets()
+        return Response(buckets.stats() if buckets is not None else {})
@@ -5,6 +5,7 @@ const API_ENDPOINTS = {
   BLOG: {
     LIST: '/api/posts/',
     DETAIL: (slug) => `/api/posts/${slug}/`,
+    BATCH: (slugs) => `/api/posts/batch/?slugs=${slugs.map(encodeURIComponent).join(',')}`,
     SEARCH: '/api/posts/?search=',
     BY_CATEGORY: (category) => `/api/posts/?category=${category}`,
     BY_TAG: (tag) => `/api/posts/?tag=${tag}`,
@@ -22,6 +23,12 @@ const API_ENDPOINTS = {
     DETAIL: (slug) => `/api/tags/${slug}/`,
   },
   
+  // Landing page bundle: featured, latest, categories and tags in one response
+  HOME: '/api/home/',
+
+  // Delta sync: created/updated/deleted posts, categories and tags after a cursor
+  CHANGES: (since = 0, horizon = 0) => `/api/changes/?since=${since}&horizon=${horizon}`,
+
   // Search endpoint (if separate)
   SEARCH: '/api/search/',
   
@@ -39,6 +39,7 @@ import {
 } from '@mui/icons-material';
 import { Helmet } from 'react-helmet-async';
 import api from '../api/axiosInstance';
+import API_ENDPOINTS from '../api/apiEndpoints';
 
 const LandingPage = () => {
   const [email, setEmail] = useState('');
@@ -66,47 +67,24 @@ const LandingPage = () => {
       });
       setError(null);
 
-      // Fetch recent posts first (main data source)
-      const recentResponse = await api.get('/api/posts/');
-      const recentPostsData = Array.isArray(recentResponse.data) ? recentResponse.data : [];
+      // Featured, latest, categories and tags arrive in one bundle request
+      const { data: home } = await api.get(API_ENDPOINTS.HOME);
+      const recentPostsData = Array.isArray(home.latest) ? home.latest : [];
       setRecentPosts(recentPostsData.slice(0, 7));
 
-      // Fetch featured posts or use first 3 recent posts as featured
-      try {
-        const featuredResponse = await api.get('/api/featured-posts/');
-        const featuredData = Array.isArray(featuredResponse.data) 
-          ? featuredResponse.data 
-          : recentPostsData.slice(0, 3);
-        setFeaturedPosts(featuredData);
-      } catch (featuredError) {
-        console.log('Using recent posts as featured:', featuredError);
-        setFeaturedPosts(recentPostsData.slice(0, 3));
-      }
+      const featuredData = Array.isArray(home.featured) && home.featured.length > 0
+        ? home.featured
+        : recentPostsData.slice(0, 3);
+      setFeaturedPosts(featuredData);
 
-      // Extract categories from posts
-      const categoriesData = [...new Set(recentPostsData.flatMap(post => 
-        (post.categories || []).map(cat => cat.name)
-      ))].map(cat => ({
-        name: cat,
-        icon: getCategoryIcon(cat),
-        count: recentPostsData.filter(post => 
-          (post.categories || []).some(c => c.name === cat)
-        ).length
-      }));
-      setCategories(categoriesData);
+      // Counts are maintained server-side per published post
+      setCategories((home.categories || []).map(cat => ({
+        name: cat.name,
+        icon: getCategoryIcon(cat.name),
+        count: cat.post_count
+      })));
 
-      // Calculate popular tags
-      const tagCounts = {};
-      recentPostsData.forEach(post => {
-        (post.tags || []).forEach(tag => {
-          tagCounts[tag.name] = (tagCounts[tag.name] || 0) + 1;
-        });
-      });
-      const sortedTags = Object.entries(tagCounts)
-        .sort(([,a], [,b]) => b - a)
-        .slice(0, 10)
-        .map(([tag]) => tag);
-      setPopularTags(sortedTags);
+      setPopularTags((home.tags || []).map(tag => tag.name));
 
       // Calculate trending posts
       const trendingData = recentPostsData